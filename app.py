@@ -1,30 +1,59 @@
 import os
 import uuid
+import queue
 import sqlite3
 from functools import wraps
 from flask import Flask, render_template, request, redirect, url_for, session, flash, g
 from werkzeug.utils import secure_filename
 from src.agents.data_visualization_agent import EDAVisualizationAgent
-from src.utils import save_dataset
+from src.utils import save_dataset, convert_to_parquet
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'csv'}
+_ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024
+app.config['AGENT'] = EDAVisualizationAgent()
+
+DATABASE_PATH = 'database/users.db'
+DB_POOL_SIZE = 8
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+)
+_db_pool = queue.Queue(maxsize=DB_POOL_SIZE)
+
+def _connect_db():
+    db = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    for pragma in SQLITE_PRAGMAS:
+        db.execute(pragma)
+    return db
 
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect('database/users.db')
-        g.db.row_factory = sqlite3.Row
+        try:
+            g.db = _db_pool.get_nowait()
+        except queue.Empty:
+            g.db = _connect_db()
     return g.db
 
 @app.teardown_appcontext
 def close_db(error):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        # Discard any uncommitted work before handing the connection back to the pool
+        db.rollback()
+        try:
+            _db_pool.put_nowait(db)
+        except queue.Full:
+            db.close()
 
 def init_db():
     db = get_db()
@@ -37,6 +66,19 @@ def init_db():
     ''')
     db.commit()
 
+@app.after_request
+def cache_plot_images(response):
+    # Plot filenames embed a hash of their content, so browsers may keep them forever
+    if request.path.startswith('/static/plots/') and response.status_code == 200:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.errorhandler(413)
+def upload_too_large(error):
+    max_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    flash(f'File is too large. The maximum upload size is {max_mb} MB.', 'error')
+    return redirect(url_for('dashboard'))
+
 def login_required(view):
     @wraps(view)
     def wrapped_view(**kwargs):
@@ -46,7 +88,7 @@ def login_required(view):
     return wrapped_view
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(os.path.join('static', 'plots'), exist_ok=True)
@@ -107,20 +149,25 @@ def dashboard():
             return redirect(request.url)
 
         if file and allowed_file(file.filename):
+            dataset_paths = []
             try:
                 filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
                 save_path = save_dataset(file, filename=filename)
+                dataset_paths.append(save_path)
+                dataset_path = convert_to_parquet(save_path)
+                dataset_paths.append(dataset_path)
 
-                agent = EDAVisualizationAgent()
-                results = agent.run(file_path=save_path)
-
-                if os.path.exists(save_path):
-                    os.remove(save_path)
+                agent = app.config['AGENT']
+                results = agent.run(file_path=dataset_path)
 
                 return render_template('dashboard.html', results=results, has_results=True)
             except Exception as e:
                 flash(f'Error during analysis: {e}', 'error')
                 return redirect(request.url)
+            finally:
+                for path in set(dataset_paths):
+                    if os.path.exists(path):
+                        os.remove(path)
         else:
             flash('Invalid file type. Please upload a CSV file.', 'error')
             return redirect(request.url)
@@ -0,0 +1,89 @@
+import threading
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# Every fast-math flag except 'nnan'/'ninf', so the NaN checks below are not optimised away
+FASTMATH_FLAGS = {'reassoc', 'contract', 'arcp', 'nsz', 'afn'}
+# Variances at or below this fraction of the sum of squares are rounding noise, not spread
+ZERO_VARIANCE_TOL = 1e-12
+# Numba's fallback 'workqueue' threading layer aborts the process if two threads enter
+# a parallel kernel at once, so calls from concurrent requests are serialised
+_kernel_lock = threading.Lock()
+
+
+@njit(parallel=True, fastmath=FASTMATH_FLAGS, cache=True)
+def _pearson_corr_pairs(columns, pair_i, pair_j):
+    n_cols, n_rows = columns.shape
+    corr = np.full((n_cols, n_cols), np.nan)
+
+    # Shift each column by its first valid value: a constant column then sums to exactly
+    # zero, and the one-pass variance below no longer cancels catastrophically
+    shifts = np.zeros(n_cols)
+    for c in prange(n_cols):
+        for r in range(n_rows):
+            value = np.float64(columns[c, r])
+            if not np.isnan(value):
+                shifts[c] = value
+                break
+
+    for p in prange(pair_i.shape[0]):
+        i = pair_i[p]
+        j = pair_j[p]
+        n = 0
+        sum_x = 0.0
+        sum_y = 0.0
+        sum_xx = 0.0
+        sum_yy = 0.0
+        sum_xy = 0.0
+
+        for r in range(n_rows):
+            x = np.float64(columns[i, r]) - shifts[i]
+            y = np.float64(columns[j, r]) - shifts[j]
+            if np.isnan(x) or np.isnan(y):
+                continue
+            n += 1
+            sum_x += x
+            sum_y += y
+            sum_xx += x * x
+            sum_yy += y * y
+            sum_xy += x * y
+
+        if n > 1:
+            cov = sum_xy - sum_x * sum_y / n
+            var_x = sum_xx - sum_x * sum_x / n
+            var_y = sum_yy - sum_y * sum_y / n
+            if var_x > ZERO_VARIANCE_TOL * sum_xx and var_y > ZERO_VARIANCE_TOL * sum_yy:
+                value = min(max(cov / np.sqrt(var_x * var_y), -1.0), 1.0)
+                corr[i, j] = value
+                corr[j, i] = value
+
+    return corr
+
+
+def pearson_corr(X: np.ndarray) -> np.ndarray:
+    """
+    Pairwise-complete Pearson correlation between the columns of X.
+    Zero-variance columns yield NaN, matching DataFrame.corr().
+    """
+    # One contiguous row per column so the inner loop walks memory sequentially
+    columns = np.ascontiguousarray(X.T, dtype=np.float32)
+    pair_i, pair_j = np.triu_indices(columns.shape[0])
+    with _kernel_lock:
+        return _pearson_corr_pairs(columns, pair_i, pair_j)
+
+
+def warm_up():
+    """Compiles (or loads from the on-disk cache) the parallel kernels ahead of the first request."""
+    if NUMBA_AVAILABLE:
+        pearson_corr(np.zeros((2, 2), dtype=np.float32))
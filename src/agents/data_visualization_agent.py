@@ -1,25 +1,233 @@
+import numpy as np
 import pandas as pd
 import warnings
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 from typing import TypedDict, Annotated, List, Optional, Dict, Any
+import io
+import tempfile
 import operator
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import SystemMessage
 from src.exception import CustomException
 import sys
 import os 
-import requests 
+import socket
 
 from src.utils import get_llm, get_dataset
+from src.agents._kernels import NUMBA_AVAILABLE, pearson_corr, warm_up
 
 warnings.filterwarnings("ignore")
 
+DATETIME_SAMPLE_SIZE = 50
+DATETIME_PATTERN = re.compile(r'^\d{2,4}[-/]\d{1,2}[-/]\d{1,4}')
+PLOTS_DIR = os.path.join("static", "plots")
+MAX_CATEGORIES = 30
+SAVEFIG_KWARGS = {"dpi": 90, "bbox_inches": "tight", "pil_kwargs": {"compress_level": 1}}
+INSIGHTS_CACHE_SIZE = 128
+MAX_ANNOTATED_COLS = 20
+OLLAMA_ADDRESS = ("localhost", 11434)
+OLLAMA_PROBE_TIMEOUT = 0.2
+MAX_STORED_PLOTS = 500
+
+# RAG insights keyed by column signature, shared by every agent in the process
+_insights_cache = OrderedDict()
+_insights_cache_lock = threading.Lock()
+
+
+def _column_signature(num_cols: List[str], cat_cols: List[str]) -> str:
+    signature = '|'.join(sorted(map(str, num_cols))) + '#' + '|'.join(sorted(map(str, cat_cols)))
+    return hashlib.sha1(signature.encode()).hexdigest()
+
+
+def _init_plot_worker():
+    """Configures seaborn once per worker process."""
+    sns.set_theme(style="whitegrid", palette="mako")
+
+
+def _save_plot(fig, stem: str) -> str:
+    """Saves `fig` under a content-addressed filename in PLOTS_DIR and returns that filename."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", **SAVEFIG_KWARGS)
+    png_bytes = buffer.getvalue()
+
+    filename = f"{stem}_{hashlib.md5(png_bytes).hexdigest()[:12]}.png"
+    filepath = os.path.join(PLOTS_DIR, filename)
+    # Same name means same bytes, so an existing file only needs marking as recently used
+    try:
+        os.utime(filepath)
+        return filename
+    except FileNotFoundError:
+        pass
+
+    # Write under a temporary name and rename, so readers never see a half-written plot;
+    # the .tmp suffix also keeps it out of _prune_plots
+    fd, tmp_path = tempfile.mkstemp(dir=PLOTS_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(png_bytes)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+
+def _prune_plots(max_files: int = MAX_STORED_PLOTS):
+    """Deletes the least recently rendered plots once PLOTS_DIR holds more than `max_files`."""
+    if not os.path.isdir(PLOTS_DIR):
+        return
+
+    plots = []
+    for entry in os.scandir(PLOTS_DIR):
+        try:
+            if entry.is_file() and entry.name.endswith('.png'):
+                plots.append((entry.stat().st_mtime, entry.path))
+        except FileNotFoundError:
+            continue
+
+    if len(plots) <= max_files:
+        return
+
+    plots.sort()
+    for _, path in plots[:len(plots) - max_files]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+
+
+# Figures reused across the columns a worker renders, keyed by plot kind
+_worker_figures = {}
+
+
+def _reuse_figure(kind: str, *args, **kwargs):
+    """Returns this process's figure for `kind`, creating it on first use and clearing it afterwards."""
+    if kind not in _worker_figures:
+        _worker_figures[kind] = plt.subplots(*args, **kwargs)
+
+    fig, axes = _worker_figures[kind]
+    for ax in np.atleast_1d(axes):
+        ax.clear()
+    return fig, axes
+
+
+def _render_numerical(series: pd.Series) -> str:
+    col = series.name
+    fig, axes = _reuse_figure("numerical", 2, 1, figsize=(10, 8), gridspec_kw={'height_ratios': [3, 1]})
+    sns.histplot(series, kde=True, ax=axes[0], color=sns.color_palette("mako", 1)[0])
+    axes[0].set_title(f'Distribution of {col}', fontsize=16)
+    sns.boxplot(x=series, ax=axes[1], color=sns.color_palette("mako", 2)[1])
+    fig.tight_layout()
+
+    return _save_plot(fig, f"hist_box_{col}")
+
+
+def _render_categorical(series: pd.Series) -> str:
+    col = series.name
+    counts = series.value_counts()
+    top = counts.nlargest(MAX_CATEGORIES)
+    labels = top.index.astype(str)
+    title = f'Frequency Count of {col}'
+    if len(counts) > MAX_CATEGORIES:
+        title += f' (top {MAX_CATEGORIES})'
+
+    # Plot the precomputed counts directly so seaborn doesn't count the column again
+    fig, ax = _reuse_figure("categorical", figsize=(12, 8))
+    sns.barplot(x=top.values, y=labels, order=labels, palette="mako", ax=ax)
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel('count')
+    ax.set_ylabel(col)
+    fig.tight_layout()
+
+    return _save_plot(fig, f"countplot_{col}")
+
+
+def _gemm_corr(X: np.ndarray) -> np.ndarray:
+    """Pearson correlation of the columns of X computed as a single float32 matrix product."""
+    scale = np.nan_to_num(np.nanmax(np.abs(X), axis=0))
+    X -= np.nanmean(X, axis=0)
+    # Missing values become the column mean (zero once centred)
+    np.nan_to_num(X, copy=False)
+
+    std = X.std(axis=0)
+    # A float32 mean can miss a constant column by an ulp, leaving a tiny non-zero spread
+    constant = std <= np.finfo(np.float32).eps * 8 * scale
+    std[constant] = 1
+    X /= std
+
+    corr = (X.T @ X) / X.shape[0]
+    # Zero-variance columns have no defined correlation, matching DataFrame.corr()
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    return corr
+
+
+def _pearson_corr(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    """Pearson correlation of `cols`, using the Numba kernel when it is installed."""
+    X = df[cols].to_numpy(dtype=np.float32, na_value=np.nan)
+    corr = pearson_corr(X) if NUMBA_AVAILABLE else _gemm_corr(X)
+    return pd.DataFrame(corr, index=cols, columns=cols)
+
+
+PLOT_RENDERERS = {
+    "numerical": _render_numerical,
+    "categorical": _render_categorical,
+}
+
+
+# One pool of plot workers per process, started on first use and shared across requests
+_plot_pool = None
+_plot_pool_lock = threading.Lock()
+
+
+def _get_plot_pool() -> ProcessPoolExecutor:
+    """Returns the shared plot worker pool, creating it on first use."""
+    global _plot_pool
+    with _plot_pool_lock:
+        if _plot_pool is None:
+            # Spawned workers never inherit the parent's Flask, pyarrow or Numba threads mid-fork
+            _plot_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_plot_worker
+            )
+        return _plot_pool
+
+
+def _reset_plot_pool(broken_pool: ProcessPoolExecutor):
+    """Drops a pool whose worker died so the next call starts a fresh one."""
+    global _plot_pool
+    with _plot_pool_lock:
+        if _plot_pool is broken_pool:
+            _plot_pool = None
+    broken_pool.shutdown(wait=False)
+
+
+def _render_plot(task) -> tuple:
+    """Worker entrypoint: renders one column's plot and returns (col, filename)."""
+    kind, col, source = task
+    # A path means a columnar file: decode only this column instead of shipping it over IPC
+    series = get_dataset(source, columns=[col])[col] if isinstance(source, str) else source
+    return col, PLOT_RENDERERS[kind](series)
+
+
 class AgentState(TypedDict):
     """
     Represents the state of the EDA & Visualization Agent.
     """
     file_path: str
+    df: Optional[pd.DataFrame]
     target_column: Optional[str]
     numerical_cols: List[str]
     categorical_cols: List[str]
@@ -27,16 +235,33 @@ class AgentState(TypedDict):
     retriever: Optional[Any] 
     insights: Annotated[List[str], operator.add] 
     visualizations: Annotated[List[Dict[str, str]], operator.add]
-    current_plot_context: Dict
+    pending_captions: Annotated[List[Dict[str, str]], operator.add]
 
 class EDAVisualizationAgent:
+    # Set once the Ollama server has answered; shared by every agent in the process
+    _ollama_checked = False
+
     def __init__(self, llm = get_llm("groq")):
         if llm is None:
             raise ValueError("An LLM instance must be provided.")
-        # self._check_ollama_connection() 
         self.llm = llm
         self.graph = self._build_graph()
         sns.set_theme(style="whitegrid", palette="mako")
+        warm_up()
+
+    @classmethod
+    def _check_ollama_connection(cls) -> bool:
+        """Checks that the Ollama server accepts TCP connections, caching a successful probe."""
+        if cls._ollama_checked:
+            return True
+
+        try:
+            with socket.create_connection(OLLAMA_ADDRESS, timeout=OLLAMA_PROBE_TIMEOUT):
+                cls._ollama_checked = True
+        except OSError:
+            print(f"⚠️ Ollama server is not reachable at {OLLAMA_ADDRESS[0]}:{OLLAMA_ADDRESS[1]}.")
+
+        return cls._ollama_checked
 
     def _get_contextual_insights(self, state: AgentState) -> dict:
         """Uses the RAG retriever to get analysis suggestions."""
@@ -48,6 +273,17 @@ class EDAVisualizationAgent:
         num_cols = state.get("numerical_cols", [])
         cat_cols = state.get("categorical_cols", [])
 
+        cache_key = _column_signature(num_cols, cat_cols)
+        with _insights_cache_lock:
+            if cache_key in _insights_cache:
+                _insights_cache.move_to_end(cache_key)
+                print("✅ RAG Insights reused from cache.")
+                return {"insights": [_insights_cache[cache_key]]}
+
+        # The retriever embeds the query through Ollama, so only probe it right before use
+        if not self._check_ollama_connection():
+            return {"insights": ["Retriever not available."]}
+
         query = (
             f"What are some common data analysis and visualization techniques "
             f"for a dataset with numerical columns like {num_cols} and "
@@ -70,23 +306,20 @@ class EDAVisualizationAgent:
             response = self.llm.invoke([SystemMessage(content=synthesis_prompt)])
             insights_summary = response.content.strip()
             print("✅ RAG Insights Generated.")
+
+            with _insights_cache_lock:
+                _insights_cache[cache_key] = insights_summary
+                if len(_insights_cache) > INSIGHTS_CACHE_SIZE:
+                    _insights_cache.popitem(last=False)
             return {"insights": [insights_summary]}
 
         except Exception as e:
             raise CustomException(e, sys)
 
 
-    def _generate_caption(self, state: AgentState) -> dict:
-        """Uses an LLM to generate an insightful caption for the last plot."""
-
-        context = state.get("current_plot_context", {})
-        if not context:
-            return {}
-
-        plot_type = context.get("plot_type", "chart")
-        details = context.get("details", "the dataset")
-
-        prompt = f"""
+    def _build_caption_prompt(self, plot_type: str, details: str) -> str:
+        """Builds the captioning prompt for a single plot."""
+        return f"""
         You are an expert data analyst providing insights for a presentation.
         A {plot_type} has been generated for {details}.
         Your task is to write a single, concise, and insightful caption for this plot.
@@ -99,31 +332,47 @@ class EDAVisualizationAgent:
         Example for a correlation heatmap:
         "Price shows a strong positive correlation with sqft_living and grade, indicating these are key drivers of value, while yr_built has a weaker relationship."
         """
-        
-        print(f"🤖 Generating caption for: {plot_type} of {details}...")
-        response = self.llm.invoke([SystemMessage(content=prompt)])
-        caption = response.content.strip()
-        
-        visualization_entry = {
-            "plot_type": plot_type,
-            "details": details,
-            "caption": caption
-        }
-        
-        print(f"\n💡 AI Caption: {caption}\n" + "-"*80)
 
-        return {"visualizations": [visualization_entry], "current_plot_context": {}}
+    def _generate_captions_batch(self, state: AgentState) -> dict:
+        """Uses an LLM to caption every pending plot in a single batched call."""
+
+        pending = state.get("pending_captions", [])
+        if not pending:
+            return {}
+
+        print(f"🤖 Generating captions for {len(pending)} plots...")
+        prompts = [
+            [SystemMessage(content=self._build_caption_prompt(plot["plot_type"], plot["details"]))]
+            for plot in pending
+        ]
+        responses = self.llm.batch(prompts)
+
+        visualizations = []
+        for plot, response in zip(pending, responses):
+            caption = response.content.strip()
+            print(f"\n💡 AI Caption ({plot['title']}): {caption}\n" + "-"*80)
+            visualizations.append({
+                "title": plot["title"],
+                "path": plot["path"],
+                "description": caption
+            })
+
+        return {"visualizations": visualizations}
 
 
     def _profile_data_for_plotting(self, state: AgentState) -> dict:
         """Entrypoint: Profiles the dataset to identify column types."""
 
-        df = get_dataset(state['file_path']).copy()
+        df = get_dataset(state['file_path'])
         
         datetime_cols = []
         for col in df.select_dtypes(include=['object']).columns:
+            sample = df[col].dropna().astype(str).head(DATETIME_SAMPLE_SIZE)
+            if sample.str.match(DATETIME_PATTERN).mean() > 0.9:
+                datetime_cols.append(col)
+                continue
             try:
-                pd.to_datetime(df[col])
+                pd.to_datetime(sample, errors='raise')
                 datetime_cols.append(col)
             except (ValueError, TypeError):
                 continue
@@ -132,115 +381,89 @@ class EDAVisualizationAgent:
         categorical_cols = [col for col in df.select_dtypes(include=['object', 'category']).columns if col not in datetime_cols]
         
         return {
+            "df": df,
             "numerical_cols": numerical_cols, 
             "categorical_cols": categorical_cols,
             "datetime_cols": datetime_cols
         }
 
+    def _render_columns(self, state: AgentState, cols: List[str], kind: str) -> List[tuple]:
+        """Renders one plot per column in a process pool, returning (col, filename) pairs."""
+        os.makedirs(PLOTS_DIR, exist_ok=True)
+        file_path = state['file_path']
+        if file_path.endswith('.parquet'):
+            tasks = [(kind, col, file_path) for col in cols]
+        else:
+            tasks = [(kind, col, state['df'][col]) for col in cols]
+
+        pool = _get_plot_pool()
+        try:
+            return list(pool.map(_render_plot, tasks))
+        except BrokenProcessPool:
+            _reset_plot_pool(pool)
+            raise
+
     def _plot_univariate_numerical(self, state: AgentState) -> dict:
-        df, cols = get_dataset(state['file_path']), state['numerical_cols']
+        cols = state['numerical_cols']
         if not cols:
-            return {"current_plot_context": {}}
-
-        for col in cols:
-            fig, axes = plt.subplots(2, 1, figsize=(10, 8), gridspec_kw={'height_ratios': [3, 1]})
-            sns.histplot(df[col], kde=True, ax=axes[0], color=sns.color_palette("mako", 1)[0])
-            axes[0].set_title(f'Distribution of {col}', fontsize=16)
-            sns.boxplot(x=df[col], ax=axes[1], color=sns.color_palette("mako", 2)[1])
-            plt.tight_layout()
-
-            plots_dir = os.path.join("static", "plots")
-            os.makedirs(plots_dir, exist_ok=True)
-            filename = f"hist_box_{col}.png"
-            filepath = os.path.join(plots_dir, filename)
-            fig.savefig(filepath)
-            plt.close(fig)
-
-            caption_state = self._generate_caption({
-                "current_plot_context": {
-                    "plot_type": "Histogram and Box Plot",
-                    "details": f"the numerical column '{col}'"
-                }
-            })
-            caption = caption_state["visualizations"][0]["caption"]
+            return {}
 
-            state["visualizations"].append({
+        pending = [
+            {
                 "title": f"Distribution of {col}",
                 "path": filename,
-                "description": caption
-            })
+                "plot_type": "Histogram and Box Plot",
+                "details": f"the numerical column '{col}'"
+            }
+            for col, filename in self._render_columns(state, cols, "numerical")
+        ]
 
-        return {}
+        return {"pending_captions": pending}
 
     def _plot_univariate_categorical(self, state: AgentState) -> dict:
 
-        df, cols = get_dataset(state['file_path']), state['categorical_cols']
+        cols = state['categorical_cols']
         if not cols:
             return {}
 
-        plots_dir = os.path.join("static", "plots")
-        os.makedirs(plots_dir, exist_ok=True)
-
-        for col in cols:
-            fig, ax = plt.subplots(figsize=(12, 8))
-            sns.countplot(y=df[col], order=df[col].value_counts().index, palette="mako", ax=ax)
-            ax.set_title(f'Frequency Count of {col}', fontsize=16)
-            plt.tight_layout()
-
-            filename = f"countplot_{col}.png"
-            filepath = os.path.join(plots_dir, filename)
-            fig.savefig(filepath)
-            plt.close(fig)
-
-            caption_state = self._generate_caption({
-                "current_plot_context": {
-                    "plot_type": "Bar Chart",
-                    "details": f"the categorical column '{col}'"
-                }
-            })
-            caption = caption_state["visualizations"][0]["caption"]
-
-            state["visualizations"].append({
+        pending = [
+            {
                 "title": f"Frequency of {col}",
                 "path": filename,
-                "description": caption
-            })
+                "plot_type": "Bar Chart",
+                "details": f"the categorical column '{col}'"
+            }
+            for col, filename in self._render_columns(state, cols, "categorical")
+        ]
 
-        return {}
+        return {"pending_captions": pending}
 
     def _plot_correlation_heatmap(self, state: AgentState) -> dict:
 
-        df, cols = get_dataset(state['file_path']), state['numerical_cols']
+        df, cols = state['df'], state['numerical_cols']
         if len(cols) < 2:
             return {}
 
         fig, ax = plt.subplots(figsize=(16, 12))
-        sns.heatmap(df[cols].corr(), annot=True, fmt=".2f", cmap="mako", linewidths=.5, ax=ax)
+        # Cell labels and borders become unreadable and dominate draw time on wide frames
+        annot = len(cols) <= MAX_ANNOTATED_COLS
+        sns.heatmap(
+            _pearson_corr(df, cols), annot=annot, fmt=".2f" if annot else "", cmap="mako",
+            linewidths=.5 if annot else 0, ax=ax, rasterized=True
+        )
         ax.set_title("Correlation Matrix of Numerical Features", fontsize=18)
         plt.tight_layout()
 
-        plots_dir = os.path.join("static", "plots")
-        os.makedirs(plots_dir, exist_ok=True)
-        filename = "correlation_heatmap.png"
-        filepath = os.path.join(plots_dir, filename)
-        fig.savefig(filepath)
+        os.makedirs(PLOTS_DIR, exist_ok=True)
+        filename = _save_plot(fig, "correlation_heatmap")
         plt.close(fig)
 
-        caption_state = self._generate_caption({
-            "current_plot_context": {
-                "plot_type": "Correlation Heatmap",
-                "details": "all numerical features"
-            }
-        })
-        caption = caption_state["visualizations"][0]["caption"]
-
-        state["visualizations"].append({
+        return {"pending_captions": [{
             "title": "Correlation Heatmap",
             "path": filename,
-            "description": caption
-        })
-
-        return {}
+            "plot_type": "Correlation Heatmap",
+            "details": "all numerical features"
+        }]}
 
     def _build_graph(self):
 
@@ -250,43 +473,45 @@ class EDAVisualizationAgent:
         workflow.add_node("plot_univariate_numerical", self._plot_univariate_numerical)
         workflow.add_node("plot_univariate_categorical", self._plot_univariate_categorical)
         workflow.add_node("plot_correlation_heatmap", self._plot_correlation_heatmap)
-        workflow.add_node("generate_caption_for_heatmap", self._generate_caption)
+        workflow.add_node("generate_captions", self._generate_captions_batch)
 
         workflow.set_entry_point("profile_data")
         workflow.add_edge("profile_data", "get_contextual_insights")
         workflow.add_edge("get_contextual_insights", "plot_univariate_numerical")
         workflow.add_edge("plot_univariate_numerical", "plot_univariate_categorical")
         workflow.add_edge("plot_univariate_categorical", "plot_correlation_heatmap")
-        workflow.add_edge("plot_correlation_heatmap", "generate_caption_for_heatmap")
-        workflow.add_edge("generate_caption_for_heatmap", END) 
+        workflow.add_edge("plot_correlation_heatmap", "generate_captions")
+        workflow.add_edge("generate_captions", END)
         
         return workflow.compile()
 
-    def run(self, file_path: str, target_column: Optional[str] = None):
+    def run(self, file_path: str, target_column: Optional[str] = None, retriever: Optional[Any] = None):
         """
         Runs the full EDA and visualization workflow, with contextual insights.
+        Pass a shared retriever (e.g. from RAGPipeline.get_retriever) to enable RAG insights.
         Returns results formatted for the dashboard template.
         """
         if not os.path.isfile(file_path):
             error_msg = (
                 f"The provided path is not a valid file: '{file_path}'\n"
-                "Please provide the correct path to your CSV dataset.\n\n"
+                "Please provide the correct path to your CSV or Parquet dataset.\n\n"
                 "Example usage:\n"
                 "agent.run('path/to/your/data.csv')"
             )
             raise FileNotFoundError(error_msg)
 
-        df = get_dataset(file_path)
-
         initial_state = {
             "file_path": file_path,
             "target_column": target_column,
+            "retriever": retriever,
             "visualizations": [],
-            "current_plot_context": {},
+            "pending_captions": [],
             "insights": []
         }
 
         final_state = self.graph.invoke(initial_state)
+        df = final_state["df"]
+        _prune_plots()
 
         results = {
             "basic_info": {
@@ -13,6 +13,9 @@ class RAGPipeline:
     Manages the creation and retrieval of a vector database for the RAG agent.
     """
 
+    # Retrievers are shared process-wide, keyed by (chroma_db_path, embedding_model).
+    _retriever_cache = {}
+
     def __init__(self, data_source=None, chroma_db_path="chroma_db", embedding_model="nomic-embed-text"):
         self.data_source = data_source if data_source else os.path.join('src', 'pipeline', 'eda_knowledge_base.csv')
         self.chroma_db_path = chroma_db_path
@@ -61,7 +64,12 @@ class RAGPipeline:
     def get_retriever(self):
         """
         Ensures the vector DB is built and returns a retriever object.
+        The retriever is built once per process and reused afterwards.
         """
+        cache_key = (self.chroma_db_path, self.embedding_model)
+        if cache_key in RAGPipeline._retriever_cache:
+            return RAGPipeline._retriever_cache[cache_key]
+
         if not os.path.exists(self.chroma_db_path):
             logging.warning(f"ChromaDB not found at '{self.chroma_db_path}'. Building it now.")
             self._build_vector_db()
@@ -71,7 +79,9 @@ class RAGPipeline:
         try:
             embeddings = OllamaEmbeddings(model=self.embedding_model)
             db = Chroma(persist_directory=self.chroma_db_path, embedding_function=embeddings)
-            return db.as_retriever(search_kwargs={'k': 5})
+            retriever = db.as_retriever(search_kwargs={'k': 5})
+            RAGPipeline._retriever_cache[cache_key] = retriever
+            return retriever
 
         except Exception as e:
             raise CustomException(e, sys)
\ No newline at end of file
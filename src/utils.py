@@ -1,11 +1,14 @@
 import os
 import sys
+import shutil
 from langchain_groq.chat_models import ChatGroq
 from langchain_ollama.chat_models import ChatOllama
 from src.logger import logging
 from src.exception import CustomException
 import pandas as pd
 
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 def get_file_path(folder='data'):
     
     try:
@@ -44,24 +47,50 @@ def get_llm(llm_type: str):
     except Exception as e:
         raise CustomException(e, sys)
     
-def get_dataset(file_path: str):
+def get_dataset(file_path: str, columns=None):
     
     try:
-        return pd.read_csv(file_path)
+        if file_path.endswith('.parquet'):
+            return pd.read_parquet(file_path, columns=columns, memory_map=True)
+
+        try:
+            # pyarrow parses multi-threaded; fall back to the C engine for files it rejects
+            return pd.read_csv(file_path, usecols=columns, engine='pyarrow')
+        except (ValueError, ImportError):
+            return pd.read_csv(file_path, usecols=columns)
     
     except Exception as e:
         
         raise CustomException(e, sys)
+
+def convert_to_parquet(file_path: str):
+    
+    df = get_dataset(file_path)
+    parquet_path = os.path.splitext(file_path)[0] + '.parquet'
+
+    try:
+        df.to_parquet(parquet_path, engine='pyarrow', compression='snappy')
+
+        logging.info(f"Dataset {file_path} is converted to Parquet at {parquet_path}")
+        return parquet_path
+
+    except (ValueError, TypeError, ImportError) as e:
+        # ArrowInvalid/ArrowTypeError subclass these, e.g. an object column mixing ints and strs;
+        # the agent reads CSV just as well, so keep using it rather than failing the upload
+        logging.warning(f"Could not convert {file_path} to Parquet ({e}); using the CSV instead.")
+        if os.path.exists(parquet_path):
+            os.remove(parquet_path)
+        return file_path
     
 def save_dataset(file, filename='dataset.csv'):
     # Create a 'data' directory if it doesn't exist
     data_dir = 'data'
     os.makedirs(data_dir, exist_ok=True)
     
-    # Read the uploaded file and save it to the 'data' folder
-    df = pd.read_csv(file)
+    # Stream the uploaded file to the 'data' folder in 1 MiB chunks, without parsing it
     save_path = os.path.join(data_dir, filename)
-    df.to_csv(save_path, index=False)
+    with open(save_path, 'wb') as dst:
+        shutil.copyfileobj(file.stream, dst, length=UPLOAD_CHUNK_SIZE)
     
     logging.info(f"Dataset is successfully saved in the folder named 'data' with path {save_path}")
 